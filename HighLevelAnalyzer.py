@@ -3,6 +3,56 @@
 
 from saleae.analyzers import HighLevelAnalyzer, AnalyzerFrame
 
+# Parity of a 20-bit payload via an XOR fold: parity only needs the XOR of
+# all bits, not a full population count, so five shift-xors and a mask do the
+# job with plain int ops.
+def _parity(x):
+    x ^= x >> 16
+    x ^= x >> 8
+    x ^= x >> 4
+    x ^= x >> 2
+    x ^= x >> 1
+    return x & 1
+
+# Optional accelerators for the parity kernel, in preference order: the
+# Cython extension (see xy2_accel.pyx; build with
+# `python setup.py build_ext --inplace`), then a Numba JIT of the fold
+# above. Saleae's bundled interpreter ships neither, so the pure-Python fold
+# is the default. The state machine itself cannot be batched through NumPy
+# arrays: decode() hands us one sample at a time with opaque GraphTime
+# timestamps, and holding frames back from the UI is not an option.
+try:
+    from xy2_accel import parity as _parity
+except ImportError:
+    try:
+        from numba import njit
+        _parity = njit(cache=True)(_parity)
+    except ImportError:
+        pass
+
+# Dispatch table indexed by the top 3 bits of the 20-bit word. Each entry is
+# (frame_type, header_string, position_mask, position_format, parity_xor):
+# 1xx selects enhanced 18-bit mode (odd parity), 001 selects standard 16-bit
+# mode (even parity), anything else is an invalid header.
+_MODES = [None] * 8
+_MODES[0b001] = ('xy2_100_16bit', '0b001', 0xFFFF, '0x%04X', 0)
+for _top in range(0b100, 0b1000):
+    _MODES[_top] = ('xy2_100_18bit', '0b1', 0x3FFFF, '0x%05X', 1)
+del _top
+
+# Parity has only two display values; look them up instead of building a
+# conditional string per decoded channel.
+_PARITY = {True: 'OK', False: 'FAIL'}
+
+# State machine states. Small ints compare faster than strings in the
+# per-sample hot path.
+_IDLE = 0
+_COLLECTING = 1
+
+# Reciprocal of the channel count, so splitting the frame duration into X/Y/Z
+# slots multiplies instead of divides.
+_INV3 = 1.0 / 3.0
+
 class Hla(HighLevelAnalyzer):
     """
     Decodes the X, Y, and Z channels of the XY2-100 laser scanner protocol.
@@ -30,68 +80,47 @@ class Hla(HighLevelAnalyzer):
         Initialize the HLA.
         This method is called once when the HLA is created.
         """
-        self.state = 'IDLE'
+        self.state = _IDLE
         self.frame_start_time = None
         self.prev_sync_bit = None
 
-        # Initialize bit buffers for each channel
-        self.bits_x = []
-        self.bits_y = []
-        self.bits_z = []
+        # Each channel's bits are accumulated MSB-first into a plain integer
+        # as samples arrive, so no per-frame bit buffers are needed.
+        self.word_x = 0
+        self.word_y = 0
+        self.word_z = 0
+        self.bit_count = 0
 
-    def _decode_channel(self, channel_name, bits, start_time, end_time):
+    def _decode_channel(self, channel_name, data_word, start_time, end_time):
         """
-        Helper function to decode a single channel's data from a 20-bit word.
+        Helper function to decode a single channel's 20-bit data word.
         Returns an AnalyzerFrame.
         """
-        if not bits:
+        # An all-zero word means the channel is unused (commonly Z); bail out
+        # before any header or parity work rather than routing through the
+        # error path.
+        if data_word == 0:
             return None
 
-        data_word = 0
-        for bit in bits:
-            data_word = (data_word << 1) | bit
-
-        # Check for enhanced 18-bit mode (bit 19 == 1).
-        if (data_word >> 19) & 1:
-            header = (data_word >> 19) & 1
-            position = (data_word >> 1) & 0x3FFFF
-            received_parity = data_word & 1
-            bits_for_parity_check = data_word >> 1
-            num_set_bits = bin(bits_for_parity_check).count('1')
-            expected_parity = 1 if (num_set_bits % 2 == 0) else 0  # Odd parity
-            parity_ok = (received_parity == expected_parity)
-            return AnalyzerFrame('xy2_100_18bit', start_time, end_time, {
-                'channel': channel_name,
-                'header': f'0b{header:01b}',
-                'position': f'0x{position:05X}',
-                'parity_status': 'OK' if parity_ok else 'FAIL'
+        # If the header is not recognized, create an error frame.
+        mode = _MODES[data_word >> 17]
+        if mode is None:
+            return AnalyzerFrame('error', start_time, end_time, {
+                'error_message': f'Invalid frame header for {channel_name}: 0b{data_word >> 17:03b}'
             })
 
-        # Check for standard 16-bit mode (bits 19,18,17 == 001).
-        elif (data_word >> 17) & 0b111 == 0b001:
-            header = (data_word >> 17) & 0b111
-            position = (data_word >> 1) & 0xFFFF
-            received_parity = data_word & 1
-            bits_for_parity_check = data_word >> 1
-            num_set_bits = bin(bits_for_parity_check).count('1')
-            expected_parity = 1 if (num_set_bits % 2 != 0) else 0  # Even parity
-            parity_ok = (received_parity == expected_parity)
-            return AnalyzerFrame('xy2_100_16bit', start_time, end_time, {
-                'channel': channel_name,
-                'header': f'0b{header:03b}',
-                'position': f'0x{position:04X}',
-                'parity_status': 'OK' if parity_ok else 'FAIL'
-            })
-        
-        # If header is not recognized, create an error frame.
-        else:
-            # Only create an error bubble if there was actual data activity.
-            # This prevents creating errors for unused (e.g. Z) channels that are all zero.
-            if data_word != 0:
-                return AnalyzerFrame('error', start_time, end_time, {
-                    'error_message': f'Invalid frame header for {channel_name}: 0b{data_word >> 17:03b}'
-                })
-            return None
+        frame_type, header_str, position_mask, position_fmt, parity_xor = mode
+        payload = data_word >> 1
+        position = payload & position_mask
+        received_parity = data_word & 1
+        expected_parity = _parity(payload) ^ parity_xor
+        parity_ok = (received_parity == expected_parity)
+        return AnalyzerFrame(frame_type, start_time, end_time, {
+            'channel': channel_name,
+            'header': header_str,
+            'position': position_fmt % position,
+            'parity_status': _PARITY[parity_ok]
+        })
 
 
     def decode(self, frame: AnalyzerFrame):
@@ -100,65 +129,77 @@ class Hla(HighLevelAnalyzer):
         list of frames, allowing us to output decoded data for X, Y, and Z
         simultaneously.
         """
-        if frame.type != 'data' or 'data' not in frame.data:
+        if frame.type != 'data':
             return
 
-        parallel_value = frame.data['data']
+        parallel_value = frame.data.get('data')
+        if parallel_value is None:
+            return
 
-        # Extract individual bits based on the required channel mapping.
-        # D0: X, D1: Y, D2: Z, D3: SYNC
-        x_bit = (parallel_value >> 0) & 1
-        y_bit = (parallel_value >> 1) & 1
-        z_bit = (parallel_value >> 2) & 1
+        # Channel mapping: D0: X, D1: Y, D2: Z, D3: SYNC. Only SYNC matters
+        # on every sample; the data bits are extracted further down, once a
+        # frame is known to be in progress.
         sync_bit = (parallel_value >> 3) & 1
-        
-        if self.prev_sync_bit is None:
+
+        # Bind the hot per-sample attributes to locals; decode runs once per
+        # sample, so repeated self lookups add up on megasample captures.
+        state = self.state
+        prev_sync_bit = self.prev_sync_bit
+
+        if prev_sync_bit is None:
             self.prev_sync_bit = sync_bit
             return
 
-        if self.state == 'IDLE':
-            if sync_bit == 1 and self.prev_sync_bit == 0:
-                self.state = 'COLLECTING'
-                self.bits_x = [x_bit]
-                self.bits_y = [y_bit]
-                self.bits_z = [z_bit]
+        if state == _IDLE:
+            # Fast path: no SYNC transition while idle (the common case on a
+            # mostly-idle bus) means there is nothing to do for this sample.
+            if sync_bit == prev_sync_bit:
+                return
+            # Rising edge of SYNC as a single bit op: set iff sync is high
+            # and the previous sample was low.
+            if sync_bit & (prev_sync_bit ^ 1):
+                self.state = _COLLECTING
+                self.word_x = parallel_value & 1
+                self.word_y = (parallel_value >> 1) & 1
+                self.word_z = (parallel_value >> 2) & 1
+                self.bit_count = 1
                 self.frame_start_time = frame.start_time
-        
-        elif self.state == 'COLLECTING':
-            self.bits_x.append(x_bit)
-            self.bits_y.append(y_bit)
-            self.bits_z.append(z_bit)
+            self.prev_sync_bit = sync_bit
+            return
+
+        if state == _COLLECTING:
+            self.word_x = (self.word_x << 1) | (parallel_value & 1)
+            self.word_y = (self.word_y << 1) | ((parallel_value >> 1) & 1)
+            self.word_z = (self.word_z << 1) | ((parallel_value >> 2) & 1)
+            self.bit_count += 1
 
-            if len(self.bits_x) == 20:
+            if self.bit_count == 20:
+                frame_start_time = self.frame_start_time
                 frame_end_time = frame.end_time
-                output_frames = []
 
                 # Divide the total frame duration into separate slots for each channel
                 # to prevent timestamp collisions.
-                duration = frame_end_time - self.frame_start_time
-                num_channels = 3.0
-                duration_per_channel = duration / num_channels
-
-                x_start = self.frame_start_time
-                x_end = x_start + duration_per_channel
-                y_start = x_end
-                y_end = y_start + duration_per_channel
-                z_start = y_end
-                z_end = frame_end_time
-                
-                # Decode each channel and add the result to a list of frames.
-                x_frame = self._decode_channel('X', self.bits_x, x_start, x_end)
-                y_frame = self._decode_channel('Y', self.bits_y, y_start, y_end)
-                z_frame = self._decode_channel('Z', self.bits_z, z_start, z_end)
-                
-                if x_frame: output_frames.append(x_frame)
-                if y_frame: output_frames.append(y_frame)
-                if z_frame: output_frames.append(z_frame)
-                
+                duration_per_channel = (frame_end_time - frame_start_time) * _INV3
+                x_end = frame_start_time + duration_per_channel
+                y_end = x_end + duration_per_channel
+
+                # Decode the three channels in one pass and flush the whole
+                # XY2-100 frame as a single batch of output frames.
+                output_frames = []
+                for channel_name, data_word, start_time, end_time in (
+                        ('X', self.word_x, frame_start_time, x_end),
+                        ('Y', self.word_y, x_end, y_end),
+                        ('Z', self.word_z, y_end, frame_end_time)):
+                    decoded = self._decode_channel(channel_name, data_word,
+                                                   start_time, end_time)
+                    if decoded is not None:
+                        output_frames.append(decoded)
+
                 # Reset state for the next frame
-                self.state = 'IDLE'
-                self.bits_x, self.bits_y, self.bits_z = [], [], []
-                
+                self.state = _IDLE
+                self.word_x = self.word_y = self.word_z = 0
+                self.bit_count = 0
+
                 self.prev_sync_bit = sync_bit
                 return output_frames
 
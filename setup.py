@@ -0,0 +1,13 @@
+# Builds the optional xy2_accel extension. The HLA itself needs no build
+# step; this is only for running the decoder outside Saleae with the
+# C-compiled parity kernel:
+#
+#     python setup.py build_ext --inplace
+
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name='xy2_accel',
+    ext_modules=cythonize('xy2_accel.pyx'),
+)
@@ -0,0 +1,26 @@
+# cython: language_level=3
+# Optional C-compiled kernel for the XY2-100 HLA. Build in place with:
+#
+#     python setup.py build_ext --inplace
+#
+# HighLevelAnalyzer.py imports this lazily and falls back to the pure-Python
+# parity fold when the extension has not been built.
+
+cdef extern from *:
+    """
+    #if defined(__GNUC__) || defined(__clang__)
+    #define XY2_POPCOUNT(x) __builtin_popcount(x)
+    #else
+    static int XY2_POPCOUNT(unsigned int x) {
+        int n = 0;
+        while (x) { x &= x - 1; n++; }
+        return n;
+    }
+    #endif
+    """
+    int XY2_POPCOUNT(unsigned int x) nogil
+
+
+def parity(unsigned int x):
+    """Return the XOR of all bits of x (0 or 1) via a hardware popcount."""
+    return XY2_POPCOUNT(x) & 1